@@ -0,0 +1,137 @@
+"""
+Compare setting the Coordinate Transformation Matrix by spawning one xinput
+process per device against a single in-process batch.
+
+Usage:
+
+.. code-block:: sh
+
+    python3 -m tabletconf.benchmark --devices 50 --repeat 5
+"""
+
+from time import perf_counter
+from statistics import median
+from collections import OrderedDict
+
+from .xvfb import xvfb
+from .xinput import set_matrix
+from .xi2 import connect, list_devices, get_matrices, set_matrices
+
+
+def _timeit(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        timings.append(perf_counter() - start)
+    return median(timings)
+
+
+def find_targets(name=None):
+    """
+    Find the devices that expose the Coordinate Transformation Matrix.
+
+    :param str name: Display name. If None, the ``DISPLAY`` environment
+     variable is used.
+
+    :return: The device IDs.
+    :rtype: list
+    """
+    with connect(name) as display:
+        devices = list(list_devices(display, pointers_only=True))
+
+    return [
+        deviceid
+        for deviceid, matrix in get_matrices(devices, name=name).items()
+        if matrix is not None
+    ]
+
+
+def bench_backends(targets, matrix, repeat=5, name=None):
+    """
+    Time writing a matrix to the given targets with both backends.
+
+    Device IDs may be repeated to simulate more devices.
+
+    :param list targets: Device IDs.
+    :param list matrix: The 3x3 matrix to write.
+    :param int repeat: Number of runs; the median is reported.
+    :param str name: Display name. If None, the ``DISPLAY`` environment
+     variable is used.
+
+    :return: Mapping of backend name to median seconds per run.
+    :rtype: OrderedDict
+    """
+    def subprocesses():
+        for deviceid in targets:
+            set_matrix(deviceid, matrix, display=name)
+
+    def batch():
+        set_matrices(
+            [(deviceid, matrix) for deviceid in targets], name=name,
+        )
+
+    results = OrderedDict()
+    results['xinput'] = _timeit(subprocesses, repeat)
+    results['xlib'] = _timeit(batch, repeat)
+    return results
+
+
+def main():
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(
+        description='Benchmark the xinput and python-xlib backends',
+    )
+    parser.add_argument(
+        '-d', '--devices', type=int, default=50,
+        help='Number of device writes per run',
+    )
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=5,
+        help='Number of runs per backend',
+    )
+    parser.add_argument(
+        '--display', default=None,
+        help='Use this X server instead of starting an Xvfb',
+    )
+    args = parser.parse_args()
+
+    matrix = [
+        [0.5, 0, 0.5],
+        [0, 0.5, 0.5],
+        [0, 0, 1],
+    ]
+
+    def run(name):
+        available = find_targets(name)
+        if not available:
+            raise RuntimeError('No device exposes the matrix property')
+
+        targets = [
+            available[index % len(available)]
+            for index in range(args.devices)
+        ]
+
+        print('{} device writes on {}'.format(len(targets), name))
+        for backend, seconds in bench_backends(
+            targets, matrix, repeat=args.repeat, name=name,
+        ).items():
+            print(
+                '{:>8}: {:10.3f} ms/run {:10.3f} ms/device'.format(
+                    backend,
+                    seconds * 1000,
+                    seconds * 1000 / len(targets),
+                )
+            )
+
+    if args.display is not None:
+        run(args.display)
+        return
+
+    with xvfb() as name:
+        run(name)
+
+
+if __name__ == '__main__':
+    main()
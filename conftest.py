@@ -0,0 +1,26 @@
+from collections import OrderedDict
+
+import pytest
+
+
+@pytest.fixture
+def displays():
+    """
+    Two side by side displays, as returned by ``parse_xrandr()``.
+    """
+    return OrderedDict((
+        ('HDMI-0', {
+            'width': 1920,
+            'height': 1080,
+            'x_offset': 0,
+            'y_offset': 0,
+            'primary': True,
+        }),
+        ('DP-1', {
+            'width': 1920,
+            'height': 1080,
+            'x_offset': 1920,
+            'y_offset': 0,
+            'primary': False,
+        }),
+    ))
@@ -91,10 +91,7 @@ class MyApp(object):
     def __init__(self, displays):
 
         # Get screens
-        self.displays = displays
-        self.selected = None
-        self.assigned = []
-        self.mapper = None
+        self._init_state(displays)
 
         # Build GUI
         self.here = Path(__file__).resolve().parent
@@ -126,6 +123,15 @@ class MyApp(object):
         # self._identifiers = []
         # self.identify_displays()
 
+    def _init_state(self, displays):
+        """
+        Initialize the state that doesn't depend on GTK.
+        """
+        self.displays = displays
+        self.selected = None
+        self.assigned = []
+        self.mapper = None
+
     def identify_displays(self):
 
         for name, display in self.displays.items():
@@ -0,0 +1,451 @@
+"""
+Synthetic input latency harness for the display picker.
+
+Drives ``MyApp.motion_cb`` and ``MyApp.click_cb`` with scripted event
+streams against an offscreen double buffer, and records the handling and
+redraw latency of every event.
+
+Latencies depend on the machine, so regressions are checked against a
+baseline measured on the same machine rather than against fixed numbers.
+Record it once, then compare later runs to it:
+
+.. code-block:: sh
+
+    python3 -m tabletconf.latency --save-baseline baseline.json
+    python3 -m tabletconf.latency --baseline baseline.json --multiple 2.5
+"""
+
+from array import array
+from math import ceil, sqrt
+from json import dump, load
+from random import Random
+from time import perf_counter
+from types import SimpleNamespace
+from collections import OrderedDict
+
+import cairo
+
+from .stats import percentile
+from .displays import MyApp
+
+
+DEFAULT_CANVAS = (800, 600)
+DEFAULT_EVENTS = 500
+DEFAULT_LAYOUTS = (1, 2, 8, 50, 200)
+
+SCRIPTS = ('sweep', 'jitter', 'clicks')
+
+# How much slower than the baseline a p99 latency may get, to absorb the
+# run to run noise
+DEFAULT_MULTIPLE = 2.5
+
+
+def grid_layout(count, width=1920, height=1080):
+    """
+    Generate a layout of displays as ``parse_xrandr()`` would return it.
+
+    :param int count: Number of displays, arranged in a square grid.
+
+    :rtype: OrderedDict
+    """
+    columns = ceil(sqrt(count))
+
+    return OrderedDict(
+        (
+            'DP-{}'.format(index),
+            {
+                'width': width,
+                'height': height,
+                'x_offset': (index % columns) * width,
+                'y_offset': (index // columns) * height,
+                'primary': index == 0,
+            },
+        )
+        for index in range(count)
+    )
+
+
+class _Drawing:
+    def queue_draw(self):
+        pass
+
+
+class OffscreenApp(MyApp):
+    """
+    Display picker without a window, drawing into an offscreen double buffer.
+
+    Every call to ``draw_displays()`` is timed into ``redraws``.
+    """
+
+    def __init__(self, displays, canvas=DEFAULT_CANVAS):
+        self._init_state(displays)
+
+        self.drawing = _Drawing()
+        self.double_buffer = cairo.ImageSurface(
+            cairo.FORMAT_ARGB32, *canvas
+        )
+        self.redraws = array('d')
+
+        self.draw_displays()
+
+    def draw_displays(self):
+        start = perf_counter()
+        super().draw_displays()
+        self.redraws.append(perf_counter() - start)
+
+
+def _motion(x, y):
+    return 'motion', SimpleNamespace(x=x, y=y)
+
+
+def _click(x, y, button=1):
+    return 'click', SimpleNamespace(x=x, y=y, button=button)
+
+
+def sweep(app, events, canvas=DEFAULT_CANVAS):
+    """
+    Raster the pointer across the whole canvas, row by row.
+    """
+    width, height = canvas
+    rows = max(1, int(sqrt(events)))
+    columns = max(1, events // rows)
+
+    for row in range(rows):
+        y = (row + 0.5) * height / rows
+        for column in range(columns):
+            yield _motion((column + 0.5) * width / columns, y)
+
+
+def jitter(app, events, canvas=DEFAULT_CANVAS, amplitude=3, seed=0):
+    """
+    Hover near the edges of random displays, moving a few pixels at a time,
+    so the selection keeps flipping between neighbours.
+    """
+    rng = Random(seed)
+    names = list(app.displays)
+
+    x, y = 0, 0
+    for index in range(events):
+        if index % 20 == 0:
+            (x, y), _ = app._map_display(app.displays[rng.choice(names)])
+        x += rng.uniform(-amplitude, amplitude)
+        y += rng.uniform(-amplitude, amplitude)
+        yield _motion(x, y)
+
+
+def clicks(app, events, canvas=DEFAULT_CANVAS, seed=0):
+    """
+    Move to the center of random displays and toggle their assignment.
+    """
+    rng = Random(seed)
+    names = list(app.displays)
+
+    for index in range(events // 2):
+        (left, top), (right, bottom) = app._map_display(
+            app.displays[rng.choice(names)]
+        )
+        x, y = (left + right) / 2, (top + bottom) / 2
+        yield _motion(x, y)
+        yield _click(x, y)
+
+
+def run_script(app, script):
+    """
+    Feed a scripted event stream to the app.
+
+    :return: The handling latency of every event, and the redraw latency of
+     the events that triggered one, in seconds.
+    :rtype: tuple
+    """
+    handling = array('d')
+    redraws = array('d')
+
+    callbacks = {
+        'motion': app.motion_cb,
+        'click': app.click_cb,
+    }
+
+    for kind, event in script:
+        drawn = len(app.redraws)
+
+        start = perf_counter()
+        callbacks[kind](None, event)
+        handling.append(perf_counter() - start)
+
+        redraws.extend(app.redraws[drawn:])
+
+    return handling, redraws
+
+
+def measure(
+    layouts=DEFAULT_LAYOUTS, scripts=SCRIPTS, events=DEFAULT_EVENTS,
+    canvas=DEFAULT_CANVAS,
+):
+    """
+    Run every script against every layout.
+
+    :param list layouts: Number of displays of each layout.
+    :param list scripts: Names of the scripts to run, from ``SCRIPTS``.
+    :param int events: Approximate number of events per script.
+    :param tuple canvas: Size of the offscreen double buffer.
+
+    :return: One result per layout and script, with the ``displays`` count,
+     the ``script`` name, the number of ``events``, and the p50/p95/p99
+     ``handling`` and ``redraw`` latencies in seconds.
+    :rtype: list
+    """
+    generators = {
+        'sweep': sweep,
+        'jitter': jitter,
+        'clicks': clicks,
+    }
+
+    results = []
+    for count in layouts:
+        for name in scripts:
+            app = OffscreenApp(grid_layout(count), canvas=canvas)
+            handling, redraws = run_script(
+                app, generators[name](app, events, canvas=canvas),
+            )
+
+            results.append(OrderedDict((
+                ('displays', count),
+                ('script', name),
+                ('events', len(handling)),
+                ('handling', tuple(
+                    percentile(handling, percent)
+                    for percent in (50, 95, 99)
+                )),
+                ('redraw', tuple(
+                    percentile(redraws, percent)
+                    for percent in (50, 95, 99)
+                )),
+            )))
+
+    return results
+
+
+def format_results(results):
+    """
+    Format the latencies as a table, in milliseconds.
+
+    :param list results: Results as returned by ``measure()``.
+
+    :rtype: str
+    """
+    lines = [
+        '{:>8} {:>7} {:>6}  {:>26}  {:>26}'.format(
+            'displays', 'script', 'events',
+            'handling p50/p95/p99 ms', 'redraw p50/p95/p99 ms',
+        ),
+    ]
+
+    for result in results:
+        lines.append(
+            '{:>8} {:>7} {:>6}  {:>8.3f} {:>8.3f} {:>8.3f}  '
+            '{:>8.3f} {:>8.3f} {:>8.3f}'.format(
+                result['displays'],
+                result['script'],
+                result['events'],
+                *(
+                    value * 1000
+                    for value in result['handling'] + result['redraw']
+                )
+            )
+        )
+
+    return '\n'.join(lines)
+
+
+def make_baseline(results):
+    """
+    Summarize results into a baseline, keeping the worst p99 of all scripts.
+
+    :param list results: Results as returned by ``measure()``.
+
+    :return: Mapping of number of displays to its (handling, redraw) p99
+     latencies, in milliseconds.
+    :rtype: OrderedDict
+    """
+    baseline = OrderedDict()
+
+    for result in results:
+        handling, redraw = baseline.get(result['displays'], (0.0, 0.0))
+        baseline[result['displays']] = (
+            max(handling, result['handling'][2] * 1000),
+            max(redraw, result['redraw'][2] * 1000),
+        )
+
+    return baseline
+
+
+def save_baseline(baseline, path):
+    """
+    Write a baseline, as returned by ``make_baseline()``, to a JSON file.
+    """
+    with open(str(path), 'w') as fd:
+        dump(
+            OrderedDict(
+                (str(count), list(values))
+                for count, values in baseline.items()
+            ),
+            fd, indent=4,
+        )
+        fd.write('\n')
+
+
+def load_baseline(path):
+    """
+    Read a baseline written by ``save_baseline()``.
+
+    :rtype: OrderedDict
+    """
+    with open(str(path)) as fd:
+        return OrderedDict(
+            (int(count), tuple(values))
+            for count, values in load(fd).items()
+        )
+
+
+def check_thresholds(
+    results, max_handling_p99=None, max_redraw_p99=None,
+    baseline=None, multiple=DEFAULT_MULTIPLE,
+):
+    """
+    Find the results over the p99 thresholds, in milliseconds.
+
+    :param list results: Results as returned by ``measure()``.
+    :param float max_handling_p99: Handling threshold for every layout,
+     instead of the one derived from ``baseline``.
+    :param float max_redraw_p99: Redraw threshold for every layout, instead of
+     the one derived from ``baseline``.
+    :param dict baseline: Baseline as returned by ``make_baseline()``. Each
+     layout in it is checked against its baseline times ``multiple``.
+     Layouts not in it are not checked unless a threshold is given
+     explicitly.
+    :param float multiple: How much slower than the baseline is tolerated.
+
+    :return: A description of each regression.
+    :rtype: list
+    """
+    regressions = []
+    baseline = baseline or {}
+
+    for result in results:
+        handling, redraw = None, None
+        if result['displays'] in baseline:
+            handling, redraw = (
+                value * multiple for value in baseline[result['displays']]
+            )
+
+        if max_handling_p99 is not None:
+            handling = max_handling_p99
+        if max_redraw_p99 is not None:
+            redraw = max_redraw_p99
+
+        for key, threshold in (
+            ('handling', handling),
+            ('redraw', redraw),
+        ):
+            if threshold is None:
+                continue
+
+            p99 = result[key][2] * 1000
+            if p99 > threshold:
+                regressions.append(
+                    '{} p99 {:.3f} ms > {:.3f} ms with {} displays '
+                    '({})'.format(
+                        key, p99, threshold,
+                        result['displays'], result['script'],
+                    )
+                )
+
+    return regressions
+
+
+def main():
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(
+        description='Measure the input latency of the display picker',
+    )
+    parser.add_argument(
+        '-d', '--displays', type=int, nargs='+', default=DEFAULT_LAYOUTS,
+        help='Number of displays of each layout to measure',
+    )
+    parser.add_argument(
+        '-s', '--scripts', nargs='+', choices=SCRIPTS, default=SCRIPTS,
+        help='Event scripts to run',
+    )
+    parser.add_argument(
+        '-e', '--events', type=int, default=DEFAULT_EVENTS,
+        help='Approximate number of events per script',
+    )
+    parser.add_argument(
+        '--baseline', default=None,
+        help='Fail if a p99 latency exceeds the one of its layout in this '
+        'baseline file times the multiple',
+    )
+    parser.add_argument(
+        '--save-baseline', default=None,
+        help='Record the p99 latencies of each layout to this baseline file',
+    )
+    parser.add_argument(
+        '-m', '--multiple', type=float, default=DEFAULT_MULTIPLE,
+        help='How much slower than the baseline is tolerated',
+    )
+    parser.add_argument(
+        '--max-handling-p99', type=float, default=None,
+        help='Fail if the p99 handling latency exceeds this, in ms, '
+        'instead of the baseline threshold',
+    )
+    parser.add_argument(
+        '--max-redraw-p99', type=float, default=None,
+        help='Fail if the p99 redraw latency exceeds this, in ms, '
+        'instead of the baseline threshold',
+    )
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline is not None:
+        baseline = load_baseline(args.baseline)
+
+    results = measure(
+        layouts=args.displays,
+        scripts=args.scripts,
+        events=args.events,
+    )
+    print(format_results(results))
+
+    if args.save_baseline is not None:
+        save_baseline(make_baseline(results), args.save_baseline)
+
+    regressions = check_thresholds(
+        results,
+        max_handling_p99=args.max_handling_p99,
+        max_redraw_p99=args.max_redraw_p99,
+        baseline=baseline,
+        multiple=args.multiple,
+    )
+    for regression in regressions:
+        print('REGRESSION: {}'.format(regression))
+
+    if regressions:
+        raise SystemExit(1)
+
+
+__all__ = [
+    'grid_layout',
+    'OffscreenApp',
+    'run_script',
+    'measure',
+    'format_results',
+    'make_baseline',
+    'save_baseline',
+    'load_baseline',
+    'check_thresholds',
+]
+
+
+if __name__ == '__main__':
+    main()
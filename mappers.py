@@ -11,6 +11,21 @@ class DomainMapper:
 
         return (value - from_low) * self._slope + to_low
 
+    def map_many(self, values, count=None):
+        """
+        Map the first ``count`` values in place.
+        """
+        from_low, _ = self._from_domain
+        to_low, _ = self._to_domain
+        slope = self._slope
+        offset = to_low - from_low * slope
+
+        if count is None:
+            count = len(values)
+
+        for index in range(count):
+            values[index] = values[index] * slope + offset
+
 
 class LinearCoordinatesMapper:
 
@@ -37,6 +52,10 @@ class LinearCoordinatesMapper:
             self._y_mapper.map(y),
         )
 
+    def map_many(self, xs, ys, count=None):
+        self._x_mapper.map_many(xs, count)
+        self._y_mapper.map_many(ys, count)
+
 
 class RatioCoordinatesMapper:
 
@@ -82,6 +101,10 @@ class RatioCoordinatesMapper:
             self._y_mapper.map(y),
         )
 
+    def map_many(self, xs, ys, count=None):
+        self._x_mapper.map_many(xs, count)
+        self._y_mapper.map_many(ys, count)
+
 
 __all__ = [
     'DomainMapper',
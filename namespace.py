@@ -2,7 +2,7 @@
 Simple dictionary to object class.
 """
 
-from collections import Mapping
+from collections.abc import Mapping
 try:
     from pprintpp import pformat
 except ImportError:
@@ -0,0 +1,221 @@
+"""
+Enumerate and apply configurations on many X servers concurrently.
+
+Usage:
+
+.. code-block:: sh
+
+    python3 -m tabletconf.parallel -d :0 -d :1 -d :2 \\
+        'Tablet Monitor Pen Pen (0)=HDMI-0'
+"""
+
+from time import perf_counter
+from logging import getLogger
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .xrandr import parse_xrandr
+from .planner import DEFAULT_TOLERANCE, plan, apply
+
+
+log = getLogger(__name__)
+
+
+DEFAULT_WORKERS = 4
+
+
+def configure(
+    display, assignments=None, tolerance=DEFAULT_TOLERANCE,
+    backend='xinput', dry_run=False,
+):
+    """
+    Enumerate the outputs of one X server and apply its configuration.
+
+    Failures are captured in the result instead of being raised.
+
+    :param str display: Display name, for example ``:1``.
+    :param dict assignments: Mapping of input device name to xrandr output
+     name. If None, outputs are only enumerated.
+    :param float tolerance: Absolute tolerance when comparing matrices.
+    :param str backend: Either ``xinput`` or ``xlib``.
+    :param bool dry_run: Plan the changes but don't apply them.
+
+    :return: A dictionary with the ``display``, the ``displays`` found, the
+     planned ``changes``, the number of devices ``applied``, the ``error``
+     if any, and the ``elapsed`` seconds.
+    :rtype: OrderedDict
+    """
+    result = OrderedDict((
+        ('display', display),
+        ('displays', None),
+        ('changes', None),
+        ('applied', 0),
+        ('error', None),
+        ('elapsed', None),
+    ))
+
+    start = perf_counter()
+    try:
+        result['displays'] = displays = parse_xrandr(display=display)
+
+        if assignments:
+            result['changes'] = changes = plan(
+                assignments,
+                displays=displays,
+                tolerance=tolerance,
+                backend=backend,
+                display=display,
+            )
+
+            if not dry_run:
+                result['applied'] = apply(
+                    changes, backend=backend, display=display,
+                )
+
+    except Exception as e:
+        log.exception('Failed to configure {}'.format(display))
+        result['error'] = e
+
+    result['elapsed'] = perf_counter() - start
+    return result
+
+
+def configure_all(targets, max_workers=DEFAULT_WORKERS, **kwargs):
+    """
+    Configure many X servers concurrently through a bounded thread pool.
+
+    :param dict targets: Mapping of display name to its assignments, as
+     expected by ``configure()``.
+    :param int max_workers: Maximum number of X servers handled at once.
+
+    Any other keyword argument is passed to ``configure()``.
+
+    :return: One result per target, in the order of ``targets``.
+    :rtype: list
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(configure, display, assignments, **kwargs)
+            for display, assignments in targets.items()
+        ]
+        return [future.result() for future in futures]
+
+
+def format_results(results):
+    """
+    Format the per-target timings and failures as a table.
+
+    :param list results: Results as returned by ``configure_all()``.
+
+    :rtype: str
+    """
+    lines = []
+
+    for result in results:
+        if result['error'] is not None:
+            status = 'FAILED: {}'.format(result['error'])
+        elif result['changes'] is None:
+            status = '{} output(s)'.format(len(result['displays']))
+        elif not result['applied']:
+            status = '{} output(s), {}/{} device(s) need changes'.format(
+                len(result['displays']),
+                sum(change['needed'] for change in result['changes']),
+                len(result['changes']),
+            )
+        else:
+            status = '{} output(s), {}/{} device(s) applied'.format(
+                len(result['displays']),
+                result['applied'],
+                len(result['changes']),
+            )
+
+        lines.append(
+            '{:<8} {:10.3f} ms  {}'.format(
+                result['display'],
+                result['elapsed'] * 1000,
+                status,
+            )
+        )
+
+    failed = sum(1 for result in results if result['error'] is not None)
+    lines.append(
+        '{} display(s), {} failed'.format(len(results), failed)
+    )
+
+    return '\n'.join(lines)
+
+
+def main():
+    from contextlib import ExitStack
+    from argparse import ArgumentParser
+
+    from .xvfb import xvfb
+    from .planner import BACKENDS, parse_assignment
+
+    parser = ArgumentParser(
+        description='Map input devices to xrandr outputs on many X servers',
+    )
+    parser.add_argument(
+        'assignments', metavar='DEVICE=OUTPUT', nargs='*',
+        type=parse_assignment,
+        help='Input device name and the xrandr output to map it to, on '
+        'every display. If none, outputs are only enumerated',
+    )
+    parser.add_argument(
+        '-d', '--display', dest='displays', action='append', default=[],
+        help='X server to configure, can be given many times',
+    )
+    parser.add_argument(
+        '--xvfb', type=int, default=0,
+        help='Also start this many Xvfb servers and configure them',
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=DEFAULT_WORKERS,
+        help='Maximum number of X servers handled at once',
+    )
+    parser.add_argument(
+        '-n', '--dry-run', action='store_true',
+        help='Only show the changes that would be applied',
+    )
+    parser.add_argument(
+        '-t', '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+        help='Absolute tolerance when comparing matrices',
+    )
+    parser.add_argument(
+        '-b', '--backend', choices=BACKENDS, default='xinput',
+        help='Use the xinput executable or python-xlib to talk to X',
+    )
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        displays = args.displays + [
+            stack.enter_context(xvfb())
+            for _ in range(args.xvfb)
+        ]
+        if not displays:
+            parser.error('No display given')
+
+        assignments = OrderedDict(args.assignments)
+        results = configure_all(
+            OrderedDict((display, assignments) for display in displays),
+            max_workers=args.jobs,
+            tolerance=args.tolerance,
+            backend=args.backend,
+            dry_run=args.dry_run,
+        )
+
+    print(format_results(results))
+
+    if any(result['error'] is not None for result in results):
+        raise SystemExit(1)
+
+
+__all__ = [
+    'configure',
+    'configure_all',
+    'format_results',
+]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,444 @@
+"""
+Streaming remapping of pen samples in user space, for setups that the
+Coordinate Transformation Matrix cannot express.
+
+Samples are ``(timestamp, x, y, pressure)`` tuples. They are collected into a
+reused columnar buffer and mapped in place, one batch at a time, through any
+mapper of the ``mappers`` module.
+
+Recorded event files hold one sample per line, as four whitespace separated
+numbers. Empty lines and lines starting with ``#`` are ignored.
+
+Usage:
+
+.. code-block:: sh
+
+    python3 -m tabletconf.pipeline events.txt \\
+        --from 15200x9500 --to 1920x1080
+"""
+
+from array import array
+from random import Random
+from itertools import repeat
+from queue import Queue, Empty
+from threading import Thread
+from time import perf_counter, sleep
+from logging import getLogger
+
+from .stats import percentile
+
+
+log = getLogger(__name__)
+
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_RESERVOIR_SIZE = 100000
+
+
+class SampleBuffer:
+    """
+    Fixed size columnar buffer of samples.
+
+    The same buffer is filled and yielded over and over, so consumers must
+    copy anything they want to keep before asking for the next batch.
+    """
+
+    __slots__ = (
+        'size', 'count',
+        'timestamps', 'xs', 'ys', 'pressures', 'produced',
+    )
+
+    def __init__(self, size=DEFAULT_BATCH_SIZE):
+        self.size = size
+        self.count = 0
+
+        zeros = bytes(array('d').itemsize * size)
+        self.timestamps = array('d', zeros)
+        self.xs = array('d', zeros)
+        self.ys = array('d', zeros)
+        self.pressures = array('d', zeros)
+        self.produced = array('d', zeros)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield (
+                self.timestamps[index],
+                self.xs[index],
+                self.ys[index],
+                self.pressures[index],
+            )
+
+
+class PipelineStats:
+    """
+    Throughput and per-sample latency of a pipeline run.
+
+    The latency of a sample is the time from it being produced until its
+    batch is yielded mapped, so it includes any time spent queued and any
+    wait for the batch to fill. Samples of a plain iterable are produced when
+    they are pulled, those of ``queue_source()`` when they are queued. The
+    mapping cost alone is kept apart in ``mapping``.
+
+    So memory stays bounded on live input, ``latencies`` holds a uniform
+    random sample of at most ``reservoir_size`` latencies, which the
+    percentiles are computed from.
+    """
+
+    def __init__(self, reservoir_size=DEFAULT_RESERVOIR_SIZE, seed=None):
+        self.samples = 0
+        self.batches = 0
+        self.elapsed = 0.0
+        self.mapping = 0.0
+        self.latencies = array('d')
+
+        self._reservoir_size = reservoir_size
+        self._observed = 0
+        self._random = Random(seed)
+
+    def add_latency(self, latency):
+        self._observed += 1
+        if len(self.latencies) < self._reservoir_size:
+            self.latencies.append(latency)
+            return
+
+        index = self._random.randrange(self._observed)
+        if index < self._reservoir_size:
+            self.latencies[index] = latency
+
+    @property
+    def throughput(self):
+        if not self.elapsed:
+            return 0.0
+        return self.samples / self.elapsed
+
+    @property
+    def mapping_per_sample(self):
+        if not self.samples:
+            return 0.0
+        return self.mapping / self.samples
+
+    def percentile(self, percent):
+        return percentile(self.latencies, percent)
+
+    def summary(self):
+        return (
+            '{} samples in {} batches, {:.3f} s, {:.0f} samples/s, '
+            'mapping {:.3f} us/sample, '
+            'latency p50 {:.3f} ms p95 {:.3f} ms p99 {:.3f} ms'.format(
+                self.samples,
+                self.batches,
+                self.elapsed,
+                self.throughput,
+                self.mapping_per_sample * 1000000,
+                self.percentile(50) * 1000,
+                self.percentile(95) * 1000,
+                self.percentile(99) * 1000,
+            )
+        )
+
+
+def replay(path, speed=None):
+    """
+    Read samples from a recorded event file.
+
+    :param str path: Path to the recorded event file.
+    :param float speed: If given, pace the samples following their
+     timestamps, in seconds, at this speed factor. If None, replay as fast as
+     possible.
+
+    :return: A generator of ``(timestamp, x, y, pressure)`` tuples.
+    """
+    start = None
+
+    with open(str(path)) as fd:
+        for lineno, line in enumerate(fd, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            try:
+                timestamp, x, y, pressure = map(float, line.split())
+            except ValueError:
+                raise RuntimeError(
+                    'Invalid sample at {}:{}: {}'.format(
+                        path, lineno, repr(line),
+                    )
+                )
+
+            if speed is not None:
+                if start is None:
+                    start = (perf_counter(), timestamp)
+
+                delay = (
+                    (timestamp - start[1]) / speed -
+                    (perf_counter() - start[0])
+                )
+                if delay > 0:
+                    sleep(delay)
+
+            yield timestamp, x, y, pressure
+
+
+def record(samples, path):
+    """
+    Write samples to an event file that ``replay()`` can read.
+
+    :param samples: Iterable of ``(timestamp, x, y, pressure)`` tuples.
+    :param str path: Path to the event file.
+
+    :return: The number of samples written.
+    :rtype: int
+    """
+    written = 0
+
+    with open(str(path), 'w') as fd:
+        fd.write('# timestamp x y pressure\n')
+        for sample in samples:
+            fd.write('{!r} {!r} {!r} {!r}\n'.format(*sample))
+            written += 1
+
+    return written
+
+
+def queue_source(samples, maxsize=0):
+    """
+    Feed samples into a queue from a background thread, so the pipeline can
+    tell when no sample is ready and send a partial batch right away.
+
+    :param samples: Iterable of ``(timestamp, x, y, pressure)`` tuples.
+    :param int maxsize: Maximum number of queued samples, 0 for unbounded.
+
+    :return: A queue of ``(produced, sample)`` tuples, where ``produced`` is
+     the ``perf_counter()`` time the sample was queued at. It ends with None,
+     or with the exception raised by the source.
+    :rtype: Queue
+    """
+    queue = Queue(maxsize)
+
+    def feed():
+        try:
+            for sample in samples:
+                queue.put((perf_counter(), sample))
+        except Exception as e:
+            queue.put(e)
+        else:
+            queue.put(None)
+
+    Thread(target=feed, daemon=True).start()
+    return queue
+
+
+def _drain(queue):
+    """
+    Iterate a queue filled by ``queue_source()``, yielding None whenever no
+    sample is ready.
+    """
+    while True:
+        try:
+            item = queue.get_nowait()
+        except Empty:
+            yield None
+            item = queue.get()
+
+        if item is None:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def _timed(samples):
+    for sample in samples:
+        yield perf_counter(), sample
+
+
+def remap_batches(
+    samples, mapper, batch_size=DEFAULT_BATCH_SIZE, stats=None,
+):
+    """
+    Map samples in batches through a reused buffer.
+
+    When ``samples`` is an iterable, a batch is sent when it is full or when
+    the source ends, which suits recorded files. For live input, pass a queue
+    from ``queue_source()``: a partial batch is then sent as soon as no more
+    samples are ready, so samples never wait for the batch to fill.
+
+    :param samples: Iterable of ``(timestamp, x, y, pressure)`` tuples, or a
+     queue of ``(produced, sample)`` tuples as returned by
+     ``queue_source()``.
+    :param mapper: Any coordinates mapper with a ``map_many()`` method.
+    :param int batch_size: Maximum number of samples per batch.
+    :param PipelineStats stats: If given, filled with the run statistics.
+
+    :return: A generator that yields the same ``SampleBuffer`` once per batch,
+     mapped in place.
+    """
+    buffer = SampleBuffer(batch_size)
+    timestamps, xs, ys, pressures, produced = (
+        buffer.timestamps, buffer.xs, buffer.ys,
+        buffer.pressures, buffer.produced,
+    )
+
+    # Pair every sample with the time it was produced at
+    if isinstance(samples, Queue):
+        samples = _drain(samples)
+    elif stats is not None:
+        samples = _timed(samples)
+    else:
+        samples = zip(repeat(0.0), samples)
+
+    def flush():
+        if stats is None:
+            mapper.map_many(xs, ys, buffer.count)
+            return
+
+        before = perf_counter()
+        mapper.map_many(xs, ys, buffer.count)
+        now = perf_counter()
+
+        stats.samples += buffer.count
+        stats.batches += 1
+        stats.mapping += now - before
+        for index in range(buffer.count):
+            stats.add_latency(now - produced[index])
+
+    start = perf_counter()
+    index = 0
+
+    try:
+        for item in samples:
+            if item is None:
+                # Nothing ready, don't hold back what we have
+                if index:
+                    buffer.count = index
+                    flush()
+                    yield buffer
+                    index = 0
+                continue
+
+            produced[index], sample = item
+            timestamps[index], xs[index], ys[index], pressures[index] = sample
+
+            index += 1
+            if index == batch_size:
+                buffer.count = index
+                flush()
+                yield buffer
+                index = 0
+
+        if index:
+            buffer.count = index
+            flush()
+            yield buffer
+
+    finally:
+        if stats is not None:
+            stats.elapsed = perf_counter() - start
+
+
+def remap(samples, mapper, batch_size=DEFAULT_BATCH_SIZE, stats=None):
+    """
+    Map samples one by one, batching them internally.
+
+    Same as ``remap_batches()``, but yields ``(timestamp, x, y, pressure)``
+    tuples.
+    """
+    for buffer in remap_batches(
+        samples, mapper, batch_size=batch_size, stats=stats,
+    ):
+        yield from buffer
+
+
+def parse_dimensions(value):
+    width, sep, height = value.partition('x')
+    if not sep:
+        raise ValueError(
+            'Invalid dimensions {}, expected WIDTHxHEIGHT'.format(repr(value))
+        )
+    return float(width), float(height)
+
+
+def main():
+    from argparse import ArgumentParser
+
+    from .mappers import LinearCoordinatesMapper, RatioCoordinatesMapper
+
+    parser = ArgumentParser(
+        description='Remap recorded pen samples and report their latency',
+    )
+    parser.add_argument(
+        'events',
+        help='Recorded event file',
+    )
+    parser.add_argument(
+        '--from', dest='from_dimensions', required=True,
+        type=parse_dimensions,
+        help='Dimensions of the input space, as WIDTHxHEIGHT',
+    )
+    parser.add_argument(
+        '--to', dest='to_dimensions', required=True,
+        type=parse_dimensions,
+        help='Dimensions of the output space, as WIDTHxHEIGHT',
+    )
+    parser.add_argument(
+        '--keep-ratio', action='store_true',
+        help='Keep the aspect ratio of the input space',
+    )
+    parser.add_argument(
+        '-s', '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+        help='Number of samples mapped at once',
+    )
+    parser.add_argument(
+        '--speed', type=float, default=None,
+        help='Replay following the recorded timestamps at this speed',
+    )
+    parser.add_argument(
+        '-o', '--output', default=None,
+        help='Write the mapped samples to this file',
+    )
+    args = parser.parse_args()
+
+    mapper_cls = (
+        RatioCoordinatesMapper
+        if args.keep_ratio else LinearCoordinatesMapper
+    )
+    mapper = mapper_cls(args.from_dimensions, args.to_dimensions)
+
+    samples = replay(args.events, speed=args.speed)
+    if args.speed is not None:
+        # Paced replay behaves like a live pen, don't wait for full batches
+        samples = queue_source(samples)
+
+    stats = PipelineStats()
+    mapped = remap(
+        samples,
+        mapper,
+        batch_size=args.batch_size,
+        stats=stats,
+    )
+
+    if args.output is not None:
+        record(mapped, args.output)
+    else:
+        for _ in mapped:
+            pass
+
+    print(stats.summary())
+
+
+__all__ = [
+    'SampleBuffer',
+    'PipelineStats',
+    'replay',
+    'record',
+    'queue_source',
+    'remap_batches',
+    'remap',
+]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""
+Plan and apply only the Coordinate Transformation Matrix changes that are
+actually needed.
+
+Usage:
+
+.. code-block:: sh
+
+    python3 -m tabletconf.planner --dry-run \\
+        'Tablet Monitor Pen Pen (0)=HDMI-0'
+"""
+
+from math import isclose
+from logging import getLogger
+from collections import OrderedDict
+
+from . import xinput
+from .xrandr import parse_xrandr, calculate_virtual_space
+from .xinput import (
+    calculate_matrix, flatten_matrix, format_matrix,
+    set_prop_command, set_matrix,
+)
+
+
+log = getLogger(__name__)
+
+
+# `xinput list-props` prints the matrix with 6 decimals
+DEFAULT_TOLERANCE = 1e-5
+
+BACKENDS = ('xinput', 'xlib')
+
+
+def matrices_equal(current, target, tolerance=DEFAULT_TOLERANCE):
+    if current is None:
+        return False
+
+    return all(
+        isclose(a, b, abs_tol=tolerance)
+        for a, b in zip(flatten_matrix(current), flatten_matrix(target))
+    )
+
+
+def get_matrices(devices, backend='xinput', display=None):
+    if backend == 'xlib':
+        from .xi2 import get_matrices
+        return get_matrices(devices, name=display)
+
+    return xinput.get_matrices(devices, display=display)
+
+
+def set_matrices(matrices, backend='xinput', display=None):
+    if backend == 'xlib':
+        from .xi2 import set_matrices
+        set_matrices(matrices, name=display)
+        return
+
+    for device, matrix in matrices.items():
+        set_matrix(device, matrix, display=display)
+
+
+def plan(
+    assignments, displays=None, tolerance=DEFAULT_TOLERANCE,
+    backend='xinput', display=None,
+):
+    """
+    Compare the current matrix of each device against the one computed from
+    the xrandr layout.
+
+    :param dict assignments: Mapping of input device name to xrandr output
+     name.
+    :param dict displays: Displays as returned by ``parse_xrandr()``. If None,
+     xrandr will be queried.
+    :param float tolerance: Absolute tolerance when comparing matrices.
+    :param str backend: Either ``xinput``, that spawns one process per device,
+     or ``xlib``, that reads all devices over a single connection.
+    :param str display: Display name. If None, the ``DISPLAY`` environment
+     variable is used.
+
+    :return: One change for each device, in assignment order. Each change is a
+     dictionary with the ``device``, ``output``, ``current`` and ``target``
+     matrices, and a ``needed`` flag.
+    :rtype: list
+    """
+    if displays is None:
+        displays = parse_xrandr(display=display)
+
+    vspace = calculate_virtual_space(displays)
+
+    for device, output in assignments.items():
+        if output not in displays:
+            raise RuntimeError(
+                'Unknown output {} for device {}'.format(
+                    repr(output), repr(device),
+                )
+            )
+
+    currents = get_matrices(
+        assignments.keys(), backend=backend, display=display,
+    )
+
+    changes = []
+    for device, output in assignments.items():
+        target = calculate_matrix(displays[output], vspace)
+        current = currents[device]
+
+        changes.append(OrderedDict((
+            ('device', device),
+            ('output', output),
+            ('current', current),
+            ('target', target),
+            ('needed', not matrices_equal(current, target, tolerance)),
+        )))
+
+    return changes
+
+
+def apply(changes, backend='xinput', display=None):
+    """
+    Apply the changes that are needed.
+
+    :param list changes: Changes as returned by ``plan()``.
+    :param str backend: Either ``xinput``, that spawns one process per device,
+     or ``xlib``, that writes all devices in one batch.
+    :param str display: Display name. If None, the ``DISPLAY`` environment
+     variable is used.
+
+    :return: The number of devices that were updated.
+    :rtype: int
+    """
+    matrices = OrderedDict()
+
+    for change in changes:
+        if not change['needed']:
+            log.debug('{} is up to date'.format(repr(change['device'])))
+            continue
+
+        log.info(
+            'Mapping {} to {}'.format(
+                repr(change['device']), change['output'],
+            )
+        )
+        matrices[change['device']] = change['target']
+
+    if matrices:
+        set_matrices(matrices, backend=backend, display=display)
+
+    return len(matrices)
+
+
+def format_plan(changes):
+    """
+    Format the changes as a human readable diff.
+
+    :param list changes: Changes as returned by ``plan()``.
+
+    :rtype: str
+    """
+    lines = []
+
+    for change in changes:
+        if not change['needed']:
+            lines.append(
+                '  {} -> {} (unchanged)'.format(
+                    change['device'], change['output'],
+                )
+            )
+            continue
+
+        lines.extend([
+            '~ {} -> {}'.format(change['device'], change['output']),
+            '  - {}'.format(
+                format_matrix(change['current'])
+                if change['current'] is not None else '<missing>'
+            ),
+            '  + {}'.format(format_matrix(change['target'])),
+            '  $ {}'.format(
+                ' '.join(
+                    '"{}"'.format(arg) if ' ' in arg else arg
+                    for arg in set_prop_command(
+                        change['device'], change['target'],
+                    )
+                )
+            ),
+        ])
+
+    needed = sum(1 for change in changes if change['needed'])
+    lines.append(
+        '{} change(s), {} unchanged'.format(needed, len(changes) - needed)
+    )
+
+    return '\n'.join(lines)
+
+
+def parse_assignment(value):
+    device, sep, output = value.rpartition('=')
+    if not sep or not device or not output:
+        raise ValueError(
+            'Invalid assignment {}, expected DEVICE=OUTPUT'.format(
+                repr(value),
+            )
+        )
+    return device, output
+
+
+def main():
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(
+        description='Map input devices to xrandr outputs, changing only the '
+        'devices that are not already mapped',
+    )
+    parser.add_argument(
+        'assignments', metavar='DEVICE=OUTPUT', nargs='+',
+        type=parse_assignment,
+        help='Input device name and the xrandr output to map it to',
+    )
+    parser.add_argument(
+        '-n', '--dry-run', action='store_true',
+        help='Only show the changes that would be applied',
+    )
+    parser.add_argument(
+        '-t', '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+        help='Absolute tolerance when comparing matrices',
+    )
+    parser.add_argument(
+        '-b', '--backend', choices=BACKENDS, default='xinput',
+        help='Use the xinput executable or python-xlib to talk to X',
+    )
+    args = parser.parse_args()
+
+    changes = plan(
+        OrderedDict(args.assignments),
+        tolerance=args.tolerance,
+        backend=args.backend,
+    )
+    print(format_plan(changes))
+
+    if not args.dry_run:
+        apply(changes, backend=args.backend)
+
+
+__all__ = [
+    'matrices_equal',
+    'plan',
+    'apply',
+    'format_plan',
+]
+
+
+if __name__ == '__main__':
+    main()
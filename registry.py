@@ -0,0 +1,378 @@
+"""
+Cached registry of the input devices of an X server.
+
+Devices are enumerated once and indexed by ID, name, type and tablet. The
+registry keeps itself current by listening to XInput 2 hierarchy events, so
+lookups never have to query the server again.
+
+Usage:
+
+.. code-block:: python3
+
+    >>> from tabletconf.registry import DeviceRegistry
+    >>> with DeviceRegistry() as registry:
+    ...     pens = registry.by_type('stylus')
+    ...     ids = registry.tablet_ids('Tablet Monitor Pen Pen (0)')
+"""
+
+from re import findall
+from os import sep
+from os.path import basename, dirname, isfile, join, realpath
+from logging import getLogger
+from collections import OrderedDict
+
+try:
+    from Xlib import X, Xatom
+    from Xlib.error import XError
+    from Xlib.ext import ge, xinput
+except ImportError:
+    xinput = None
+
+from .xi2 import open_display
+
+
+log = getLogger(__name__)
+
+
+DEVICE_TYPES = ('stylus', 'eraser', 'pad', 'touch', 'other')
+
+PRODUCT_ID_PROPERTY = 'Device Product ID'
+DEVICE_NODE_PROPERTY = 'Device Node'
+WACOM_TOOL_TYPE_PROPERTY = 'Wacom Tool Type'
+LIBINPUT_TOOL_PROPERTY = 'libinput Tablet Tool Pressurecurve'
+LIBINPUT_PAD_PROPERTY = 'libinput Tablet Pad Mode Groups Available'
+
+# Atoms the Wacom driver sets as its tool type
+WACOM_TOOL_TYPES = {
+    'STYLUS': 'stylus',
+    'ERASER': 'eraser',
+    'PAD': 'pad',
+    'TOUCH': 'touch',
+    'CURSOR': 'other',
+}
+
+
+def classify(name, classes=(), tool_type=None):
+    """
+    Find the type of an input device.
+
+    The type reported by the driver wins. Otherwise, devices with a touch
+    class are touch devices, and as a last resort the words of the device
+    name are matched, following the naming of the Wacom and libinput
+    drivers.
+
+    :param str name: Device name.
+    :param list classes: XInput 2 classes of the device.
+    :param str tool_type: Type reported by the driver, one of
+     ``DEVICE_TYPES``, or None if unknown.
+
+    :return: One of ``DEVICE_TYPES``.
+    :rtype: str
+    """
+    if tool_type is not None:
+        return tool_type
+
+    if xinput is not None and any(
+        cls.type == xinput.TouchClass for cls in classes
+    ):
+        return 'touch'
+
+    words = findall(r'[a-z]+', name.lower())
+
+    # Touchpads are not tablets, however their name is spelled
+    if 'touchpad' in words or ('touch' in words and 'pad' in words):
+        return 'other'
+
+    if 'eraser' in words:
+        return 'eraser'
+    if 'pad' in words:
+        return 'pad'
+    if 'touch' in words or 'finger' in words:
+        return 'touch'
+    if 'stylus' in words or 'pen' in words:
+        return 'stylus'
+
+    return 'other'
+
+
+def physical_path(node, sysfs='/sys'):
+    """
+    Find the sysfs path of the physical device behind an event node, so all
+    the interfaces of a USB tablet share it while two identical tablets
+    don't.
+
+    The input device hangs from a HID device, itself under one interface of
+    the USB device, so this walks up to the nearest ancestor with an
+    ``idVendor`` file, which only USB devices have.
+
+    :param str node: Device node, for example ``/dev/input/event5``.
+    :param str sysfs: Mount point of sysfs.
+
+    :return: The sysfs path, or the node itself if no USB device is found.
+    :rtype: str
+    """
+    devices = join(realpath(sysfs), 'devices')
+    path = realpath(
+        join(sysfs, 'class', 'input', basename(node), 'device')
+    )
+
+    while path.startswith(devices + sep):
+        if isfile(join(path, 'idVendor')):
+            return path
+        path = dirname(path)
+
+    return node
+
+
+class DeviceRegistry:
+    """
+    Input devices of an X server, indexed for constant time lookups.
+
+    Each device is a dictionary with its ``id``, ``name``, ``use``,
+    ``attachment``, ``enabled`` state, ``type`` (one of ``DEVICE_TYPES``) and
+    ``tablet`` key. Devices that share the USB vendor and product ID and the
+    physical device behind their node belong to the same tablet, so two
+    identical tablets stay apart. When the driver doesn't expose the product
+    ID, the device name is used instead.
+    """
+
+    def __init__(self, name=None):
+        self._display = open_display(name)
+
+        self._by_id = OrderedDict()
+        self._by_name = {}
+        self._by_type = {devtype: set() for devtype in DEVICE_TYPES}
+        self._by_tablet = {}
+
+        try:
+            intern = self._display.intern_atom
+            self._product_id = intern(PRODUCT_ID_PROPERTY)
+            self._device_node = intern(DEVICE_NODE_PROPERTY)
+            self._wacom_tool_type = intern(WACOM_TOOL_TYPE_PROPERTY)
+            self._libinput_types = (
+                (intern(LIBINPUT_TOOL_PROPERTY), 'stylus'),
+                (intern(LIBINPUT_PAD_PROPERTY), 'pad'),
+            )
+            self._wacom_tool_types = {
+                intern(atom): devtype
+                for atom, devtype in WACOM_TOOL_TYPES.items()
+            }
+
+            # Subscribe before enumerating so no hotplug is missed in between
+            self._display.screen().root.xinput_select_events([
+                (xinput.AllDevices, xinput.HierarchyChangedMask),
+            ])
+
+            for info in self._display.xinput_query_device(
+                xinput.AllDevices
+            ).devices:
+                self._add(info)
+
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._display.close()
+
+    def fileno(self):
+        """
+        File descriptor of the X connection, to wait for hotplug events in a
+        ``select()`` loop before calling ``process_events()``.
+        """
+        return self._display.fileno()
+
+    def _property(self, deviceid, prop, prop_type, length):
+        reply = self._display.xinput_get_device_property(
+            deviceid, prop, prop_type, 0, length,
+        )
+        if reply.type != prop_type or not reply.value:
+            return None
+        return reply.value[1]
+
+    def _tool_type(self, deviceid, name):
+        value = self._property(
+            deviceid, self._wacom_tool_type, Xatom.ATOM, 1,
+        )
+        if value:
+            return self._wacom_tool_types.get(value[0], 'other')
+
+        for prop, devtype in self._libinput_types:
+            reply = self._display.xinput_get_device_property(
+                deviceid, prop, X.AnyPropertyType, 0, 0,
+            )
+            if not reply.type:
+                continue
+
+            # libinput reports pens and erasers as the same kind of tool
+            if devtype == 'stylus' and classify(name) == 'eraser':
+                return 'eraser'
+            return devtype
+
+        return None
+
+    def _tablet_key(self, deviceid, name):
+        product = self._property(
+            deviceid, self._product_id, Xatom.INTEGER, 2,
+        )
+        if not product or len(product) != 2:
+            return name
+
+        vendor, product = product
+        node = self._property(
+            deviceid, self._device_node, Xatom.STRING, 1024,
+        )
+        if not node:
+            return (vendor, product)
+
+        return (vendor, product, physical_path(node.decode()))
+
+    def _add(self, info):
+        self._remove(info.deviceid)
+
+        device = OrderedDict((
+            ('id', info.deviceid),
+            ('name', info.name),
+            ('use', info.use),
+            ('attachment', info.attachment),
+            ('enabled', bool(info.enabled)),
+            ('type', classify(
+                info.name, info.classes,
+                self._tool_type(info.deviceid, info.name),
+            )),
+            ('tablet', self._tablet_key(info.deviceid, info.name)),
+        ))
+
+        self._by_id[device['id']] = device
+        self._by_name.setdefault(device['name'], set()).add(device['id'])
+        self._by_type[device['type']].add(device['id'])
+        self._by_tablet.setdefault(device['tablet'], set()).add(device['id'])
+
+        log.debug('Device {id} {name!r} registered as {type}'.format(**device))
+
+    def _remove(self, deviceid):
+        device = self._by_id.pop(deviceid, None)
+        if device is None:
+            return
+
+        for index, key in (
+            (self._by_name, device['name']),
+            (self._by_tablet, device['tablet']),
+        ):
+            index[key].discard(deviceid)
+            if not index[key]:
+                del index[key]
+        self._by_type[device['type']].discard(deviceid)
+
+        log.debug('Device {id} {name!r} unregistered'.format(**device))
+
+    def _handle(self, event):
+        for info in event.data.info:
+            if info.flags & (xinput.SlaveRemoved | xinput.MasterRemoved):
+                self._remove(info.deviceid)
+                continue
+
+            if info.flags & (
+                xinput.SlaveAdded | xinput.MasterAdded |
+                xinput.SlaveAttached | xinput.SlaveDetached |
+                xinput.DeviceEnabled | xinput.DeviceDisabled
+            ):
+                try:
+                    self._add(
+                        self._display.xinput_query_device(
+                            info.deviceid
+                        ).devices[0]
+                    )
+                except XError:
+                    # Unplugged since, its removal event is on the way
+                    self._remove(info.deviceid)
+
+    def process_events(self):
+        """
+        Apply the pending hotplug events, without blocking.
+
+        :return: The number of hierarchy events processed.
+        :rtype: int
+        """
+        processed = 0
+
+        while self._display.pending_events():
+            event = self._display.next_event()
+            if (
+                event.type != ge.GenericEventCode or
+                event.evtype != xinput.HierarchyChanged
+            ):
+                continue
+
+            self._handle(event)
+            processed += 1
+
+        return processed
+
+    def devices(self):
+        self.process_events()
+        return list(self._by_id.values())
+
+    def get(self, deviceid):
+        self.process_events()
+        return self._by_id.get(deviceid)
+
+    def by_name(self, name):
+        self.process_events()
+        return [
+            self._by_id[deviceid]
+            for deviceid in self._by_name.get(name, ())
+        ]
+
+    def by_type(self, devtype):
+        self.process_events()
+        return [
+            self._by_id[deviceid]
+            for deviceid in self._by_type[devtype]
+        ]
+
+    def tablet_ids(self, device):
+        """
+        IDs of all devices that belong to the same tablet as the given one.
+
+        :param device: Device name or ID.
+
+        :rtype: frozenset
+        """
+        self.process_events()
+
+        if isinstance(device, int):
+            ids = [device] if device in self._by_id else []
+        else:
+            ids = self._by_name.get(device, ())
+
+        tablets = {self._by_id[deviceid]['tablet'] for deviceid in ids}
+        if not tablets:
+            raise RuntimeError('Unknown device {}'.format(repr(device)))
+
+        # Identical tablets register devices with the same name
+        if len(tablets) > 1:
+            raise RuntimeError(
+                'Devices named {} belong to {} tablets, use one of the '
+                'IDs {} instead'.format(
+                    repr(device), len(tablets),
+                    ', '.join(map(str, sorted(ids))),
+                )
+            )
+
+        tablet, = tablets
+        return frozenset(self._by_tablet[tablet])
+
+
+__all__ = [
+    'DEVICE_TYPES',
+    'classify',
+    'physical_path',
+    'DeviceRegistry',
+]
@@ -0,0 +1,28 @@
+"""
+Statistics shared by the benchmarks and harnesses.
+"""
+
+from math import ceil
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile of the given values.
+
+    :param values: Sequence of numbers.
+    :param float percent: Percentile, from 0 to 100.
+
+    :return: The smallest value such that at least ``percent`` percent of the
+     values are less or equal to it, or 0.0 if there are no values.
+    """
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(1, ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+__all__ = [
+    'percentile',
+]
@@ -0,0 +1,48 @@
+from os import environ
+
+import pytest
+
+pytest.importorskip('gi')
+pytest.importorskip('cairo')
+if not environ.get('DISPLAY'):
+    pytest.skip(
+        'The display picker needs an X server', allow_module_level=True,
+    )
+
+from .latency import (  # noqa: E402
+    DEFAULT_LAYOUTS, measure, make_baseline, save_baseline, load_baseline,
+    check_thresholds,
+)
+
+
+def result(displays, handling, redraw):
+    return {
+        'displays': displays,
+        'script': 'sweep',
+        'handling': (0, 0, handling / 1000),
+        'redraw': (0, 0, redraw / 1000),
+    }
+
+
+def test_check_thresholds():
+    baseline = {1: (1.0, 2.0), 50: (4.0, 8.0)}
+    results = [
+        result(1, 2.0, 6.0),
+        result(2, 100.0, 100.0),
+        result(50, 12.0, 8.0),
+    ]
+
+    assert len(check_thresholds(results, baseline=baseline)) == 2
+    assert check_thresholds(results, baseline=baseline, multiple=3) == []
+    assert len(check_thresholds(results, max_handling_p99=50)) == 1
+
+
+def test_latency_against_baseline(tmp_path):
+    path = tmp_path / 'baseline.json'
+    save_baseline(make_baseline(measure(events=100)), path)
+
+    baseline = load_baseline(path)
+    assert sorted(baseline) == sorted(DEFAULT_LAYOUTS)
+
+    # A second run must stay within the tolerated noise
+    assert check_thresholds(measure(events=100), baseline=baseline) == []
@@ -0,0 +1,106 @@
+from shutil import which
+from contextlib import ExitStack
+from collections import OrderedDict
+
+import pytest
+
+from . import parallel
+from .xvfb import xvfb
+from .parallel import configure, configure_all, format_results
+
+
+def change(needed):
+    return {'device': 'pen', 'output': 'HDMI-0', 'needed': needed}
+
+
+def result(display, **kwargs):
+    values = OrderedDict((
+        ('display', display),
+        ('displays', None),
+        ('changes', None),
+        ('applied', 0),
+        ('error', None),
+        ('elapsed', 0.0015),
+    ))
+    values.update(kwargs)
+    return values
+
+
+def test_configure_captures_errors(monkeypatch):
+    def parse_xrandr(display=None):
+        raise RuntimeError('Can\'t open display {}'.format(display))
+
+    monkeypatch.setattr(parallel, 'parse_xrandr', parse_xrandr)
+
+    outcome = configure(':5', {'pen': 'HDMI-0'})
+
+    assert outcome['display'] == ':5'
+    assert str(outcome['error']) == 'Can\'t open display :5'
+    assert outcome['elapsed'] is not None
+
+
+def test_configure_enumerates_only(monkeypatch, displays):
+    monkeypatch.setattr(
+        parallel, 'parse_xrandr', lambda display=None: displays,
+    )
+
+    outcome = configure(':5')
+
+    assert outcome['displays'] is displays
+    assert outcome['changes'] is None
+    assert outcome['error'] is None
+
+
+def test_format_results(displays):
+    output = format_results([
+        result(':0', error=RuntimeError('boom')),
+        result(':1', displays=displays),
+        result(':2', displays=displays, changes=[
+            change(True), change(False), change(True),
+        ]),
+        result(':3', displays=displays, applied=1, changes=[
+            change(True), change(False),
+        ]),
+    ])
+
+    assert output.splitlines() == [
+        ':0            1.500 ms  FAILED: boom',
+        ':1            1.500 ms  2 output(s)',
+        ':2            1.500 ms  2 output(s), 2/3 device(s) need changes',
+        ':3            1.500 ms  2 output(s), 1/2 device(s) applied',
+        '4 display(s), 1 failed',
+    ]
+
+
+@pytest.mark.skipif(
+    not all(map(which, ('Xvfb', 'xrandr', 'xinput'))),
+    reason='Xvfb, xrandr and xinput are needed',
+)
+def test_configure_all_xvfb():
+    with ExitStack() as stack:
+        names = [stack.enter_context(xvfb()) for _ in range(3)]
+        targets = names + [':999']
+
+        enumerated = configure_all(
+            OrderedDict((name, None) for name in targets),
+            max_workers=2,
+        )
+        planned = configure_all(
+            OrderedDict(
+                (name, {'Virtual core XTEST pointer': 'screen'})
+                for name in targets
+            ),
+            max_workers=2,
+            dry_run=True,
+        )
+
+    for results in (enumerated, planned):
+        assert [outcome['display'] for outcome in results] == targets
+        assert all(outcome['error'] is None for outcome in results[:-1])
+        assert results[-1]['error'] is not None
+
+    assert all(list(outcome['displays']) for outcome in enumerated[:-1])
+    assert all(
+        len(outcome['changes']) == 1 and outcome['applied'] == 0
+        for outcome in planned[:-1]
+    )
@@ -0,0 +1,133 @@
+from array import array
+from queue import Queue
+from time import perf_counter, sleep
+
+import pytest
+
+from .mappers import LinearCoordinatesMapper, RatioCoordinatesMapper
+from .pipeline import (
+    PipelineStats, replay, record, queue_source, remap_batches, remap,
+)
+
+
+SAMPLES = [
+    (index * 0.005, index * 7.5, 1000 - index * 3.25, (index % 10) / 10)
+    for index in range(10)
+]
+
+
+@pytest.mark.parametrize('mapper_cls', [
+    LinearCoordinatesMapper,
+    RatioCoordinatesMapper,
+])
+def test_map_many(mapper_cls):
+    mapper = mapper_cls((200, 1000), (1920, 1080), padding=(1, 2, 3, 4))
+
+    xs = array('d', (sample[1] for sample in SAMPLES))
+    ys = array('d', (sample[2] for sample in SAMPLES))
+    mapper.map_many(xs, ys)
+
+    assert list(zip(xs, ys)) == pytest.approx([
+        mapper.map(x, y) for _, x, y, _ in SAMPLES
+    ])
+
+
+def test_map_many_count():
+    mapper = LinearCoordinatesMapper((100, 100), (200, 200))
+
+    xs = array('d', [10, 20, 30])
+    ys = array('d', [10, 20, 30])
+    mapper.map_many(xs, ys, 2)
+
+    assert list(xs) == [20, 40, 30]
+    assert list(ys) == [20, 40, 30]
+
+
+def test_record_replay(tmp_path):
+    path = tmp_path / 'events.txt'
+
+    assert record(SAMPLES, path) == len(SAMPLES)
+    assert list(replay(path)) == SAMPLES
+
+
+def test_replay_invalid(tmp_path):
+    path = tmp_path / 'events.txt'
+    path.write_text('# comment\n\n0 1 2 3\n0 1 2\n')
+
+    with pytest.raises(RuntimeError):
+        list(replay(path))
+
+
+def test_remap_partial_batch():
+    mapper = LinearCoordinatesMapper((100, 100), (200, 200))
+    stats = PipelineStats()
+
+    sizes = [
+        len(buffer)
+        for buffer in remap_batches(SAMPLES, mapper, batch_size=4, stats=stats)
+    ]
+
+    assert sizes == [4, 4, 2]
+    assert stats.samples == len(SAMPLES)
+    assert stats.batches == 3
+    assert list(remap(SAMPLES, mapper, batch_size=4)) == [
+        (t, x * 2, y * 2, p) for t, x, y, p in SAMPLES
+    ]
+
+
+def test_remap_queue_does_not_wait_for_full_batch():
+    mapper = LinearCoordinatesMapper((100, 100), (200, 200))
+
+    queue = Queue()
+    for sample in SAMPLES[:3]:
+        queue.put((perf_counter(), sample))
+
+    # The source is still open, but the ready samples must go through
+    batches = remap_batches(queue, mapper, batch_size=256)
+    assert len(next(batches)) == 3
+
+    queue.put((perf_counter(), SAMPLES[3]))
+    queue.put(None)
+    assert len(next(batches)) == 1
+    assert list(batches) == []
+
+
+def test_remap_stats_on_early_stop():
+    mapper = LinearCoordinatesMapper((100, 100), (200, 200))
+    stats = PipelineStats()
+
+    batches = remap_batches(SAMPLES, mapper, batch_size=2, stats=stats)
+    next(batches)
+    batches.close()
+
+    assert stats.samples == 2
+    assert stats.elapsed > 0
+    assert stats.throughput > 0
+
+
+def test_remap_latency_from_production():
+    mapper = LinearCoordinatesMapper((100, 100), (200, 200))
+    stats = PipelineStats()
+
+    queue = queue_source(SAMPLES)
+    while queue.qsize() <= len(SAMPLES):
+        sleep(0.001)
+
+    # Samples waiting in the queue are late already
+    sleep(0.05)
+    assert list(remap(queue, mapper, stats=stats)) == [
+        (t, x * 2, y * 2, p) for t, x, y, p in SAMPLES
+    ]
+    assert min(stats.latencies) >= 0.05
+
+
+def test_stats_reservoir():
+    mapper = LinearCoordinatesMapper((100, 100), (200, 200))
+    stats = PipelineStats(reservoir_size=4, seed=0)
+
+    for _ in remap(SAMPLES * 10, mapper, batch_size=8, stats=stats):
+        pass
+
+    assert stats.samples == len(SAMPLES) * 10
+    assert len(stats.latencies) == 4
+    assert stats.percentile(99) > 0
@@ -0,0 +1,168 @@
+from types import SimpleNamespace
+from collections import OrderedDict
+
+import pytest
+
+from . import xinput
+from .xinput import calculate_matrix, get_matrices
+from .planner import (
+    DEFAULT_TOLERANCE,
+    matrices_equal, plan, format_plan, parse_assignment,
+)
+
+
+IDENTITY = [[1, 0, 0], [0, 1, 0], [0, 0, 1]]
+
+
+@pytest.fixture
+def current(monkeypatch):
+    """
+    Current matrix of each device, served instead of running xinput. The
+    device lists of each read are kept in ``current.calls``.
+    """
+    matrices = {}
+    calls = []
+
+    def get_matrices(devices, display=None):
+        devices = list(devices)
+        calls.append(devices)
+        return OrderedDict(
+            (device, matrices.get(device)) for device in devices
+        )
+
+    monkeypatch.setattr(xinput, 'get_matrices', get_matrices)
+    return SimpleNamespace(matrices=matrices, calls=calls)
+
+
+def test_calculate_matrix(displays):
+    assert calculate_matrix(displays['DP-1'], (3840, 1080)) == [
+        [0.5, 0, 0.5],
+        [0, 1.0, 0.0],
+        [0, 0, 1],
+    ]
+
+
+def test_matrices_equal_tolerance():
+    near = [[1 + DEFAULT_TOLERANCE / 2, 0, 0], [0, 1, 0], [0, 0, 1]]
+    far = [[1 + DEFAULT_TOLERANCE * 2, 0, 0], [0, 1, 0], [0, 0, 1]]
+
+    assert matrices_equal(near, IDENTITY)
+    assert not matrices_equal(far, IDENTITY)
+    assert not matrices_equal(None, IDENTITY)
+
+
+def test_plan(current, displays):
+    current.matrices.update({
+        'pen': [[0.5, 0, 0], [0, 1, 0], [0, 0, 1]],
+        'touch': IDENTITY,
+    })
+
+    changes = plan(
+        OrderedDict((
+            ('pen', 'HDMI-0'),
+            ('touch', 'DP-1'),
+            ('eraser', 'DP-1'),
+        )),
+        displays=displays,
+    )
+
+    assert [change['device'] for change in changes] == [
+        'pen', 'touch', 'eraser',
+    ]
+    assert [change['needed'] for change in changes] == [False, True, True]
+    assert changes[1]['target'] == [[0.5, 0, 0.5], [0, 1.0, 0.0], [0, 0, 1]]
+    assert changes[2]['current'] is None
+
+    # All devices are read at once
+    assert current.calls == [['pen', 'touch', 'eraser']]
+
+
+def test_plan_unknown_output(current, displays):
+    with pytest.raises(RuntimeError):
+        plan({'pen': 'VGA-0'}, displays=displays)
+
+
+def test_format_plan(current, displays):
+    current.matrices['pen'] = IDENTITY
+
+    output = format_plan(plan(
+        OrderedDict((('pen', 'HDMI-0'), ('eraser', 'DP-1'))),
+        displays=displays,
+    ))
+
+    assert output.splitlines() == [
+        '~ pen -> HDMI-0',
+        '  - 1 0 0 0 1 0 0 0 1',
+        '  + 0.5 0 0.0 0 1.0 0.0 0 0 1',
+        '  $ xinput set-prop pen --type=float '
+        '"Coordinate Transformation Matrix" 0.5 0 0.0 0 1.0 0.0 0 0 1',
+        '~ eraser -> DP-1',
+        '  - <missing>',
+        '  + 0.5 0 0.5 0 1.0 0.0 0 0 1',
+        '  $ xinput set-prop eraser --type=float '
+        '"Coordinate Transformation Matrix" 0.5 0 0.5 0 1.0 0.0 0 0 1',
+        '2 change(s), 0 unchanged',
+    ]
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('pen=HDMI-0', ('pen', 'HDMI-0')),
+    ('Pen Pen (0)=DP-1', ('Pen Pen (0)', 'DP-1')),
+    ('Weird=Name=HDMI-0', ('Weird=Name', 'HDMI-0')),
+])
+def test_parse_assignment(value, expected):
+    assert parse_assignment(value) == expected
+
+
+@pytest.mark.parametrize('value', ['pen', '=HDMI-0', 'pen='])
+def test_parse_assignment_invalid(value):
+    with pytest.raises(ValueError):
+        parse_assignment(value)
+
+
+LIST_PROPS = """\
+Device 'Tablet Pen':
+\tDevice Enabled (115):\t1
+\tCoordinate Transformation Matrix (117):\t0.500000, 0.000000, 0.500000, \
+0.000000, 1.000000, 0.000000, 0.000000, 0.000000, 1.000000
+Device 'Tablet Pad':
+\tDevice Enabled (115):\t1
+"""
+
+
+def stub_run(monkeypatch, stdout, stderr=''):
+    commands = []
+
+    def run(command, **kwargs):
+        commands.append(command)
+        return SimpleNamespace(stdout=stdout, stderr=stderr)
+
+    monkeypatch.setattr(xinput, '_xinput', lambda: 'xinput')
+    monkeypatch.setattr(xinput, 'run', run)
+    return commands
+
+
+def test_get_matrices(monkeypatch):
+    commands = stub_run(monkeypatch, LIST_PROPS)
+
+    assert get_matrices(['Tablet Pen', 12]) == OrderedDict((
+        ('Tablet Pen', [[0.5, 0, 0.5], [0, 1, 0], [0, 0, 1]]),
+        (12, None),
+    ))
+    assert commands == [['xinput', 'list-props', 'Tablet Pen', '12']]
+
+
+def test_get_matrices_missing_device(monkeypatch):
+    stub_run(
+        monkeypatch, LIST_PROPS, "unable to find device 'Tablet Touch'",
+    )
+
+    with pytest.raises(RuntimeError):
+        get_matrices(['Tablet Pen', 'Tablet Touch', 'Tablet Pad'])
+
+
+def test_get_matrices_empty(monkeypatch):
+    commands = stub_run(monkeypatch, '')
+
+    assert get_matrices([]) == OrderedDict()
+    assert commands == []
@@ -0,0 +1,240 @@
+from os import makedirs, symlink
+from os.path import join
+from types import SimpleNamespace
+
+import pytest
+
+from . import registry
+from .registry import DeviceRegistry, classify, physical_path, xinput
+
+
+USB = 'devices/pci0000:00/0000:00:14.0/usb1/1-2'
+
+
+@pytest.mark.parametrize('name, tool_type, expected', [
+    ('Wacom Intuos Pro M Pen stylus', None, 'stylus'),
+    ('Wacom Intuos Pro M Pen eraser', None, 'eraser'),
+    ('Wacom Intuos Pro M Pad pad', None, 'pad'),
+    ('Wacom Intuos Pro M Finger touch', None, 'touch'),
+    ('Tablet Monitor Pen Pen (0)', None, 'stylus'),
+    ('SynPS/2 Synaptics TouchPad', None, 'other'),
+    ('Wacom Touch Pad', None, 'other'),
+    ('Apple Magic Trackpad', None, 'other'),
+    ('Xbox Wireless Gamepad', None, 'other'),
+    ('USB Numeric Keypad', None, 'other'),
+    ('Open Source Keyboard', None, 'other'),
+    ('Tablet Monitor Pen Pen (0)', 'eraser', 'eraser'),
+    ('Wacom Touch Pad', 'pad', 'pad'),
+])
+def test_classify(name, tool_type, expected):
+    assert classify(name, tool_type=tool_type) == expected
+
+
+def test_classify_touch_class():
+    if xinput is None:
+        pytest.skip('python-xlib is needed')
+
+    classes = [SimpleNamespace(type=xinput.TouchClass)]
+    assert classify('ELAN Touchscreen', classes) == 'touch'
+    assert classify('ELAN Touchscreen Pen', classes, 'stylus') == 'stylus'
+
+
+def add_event(sysfs, event, parent):
+    input_dir = join(sysfs, parent, 'input', 'input' + event[5:])
+    makedirs(join(input_dir, event))
+    symlink(input_dir, join(input_dir, event, 'device'))
+
+    makedirs(join(sysfs, 'class', 'input'), exist_ok=True)
+    symlink(join(input_dir, event), join(sysfs, 'class', 'input', event))
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    root = str(tmp_path)
+
+    for device in ('devices/pci0000:00/0000:00:14.0/usb1', USB):
+        makedirs(join(root, device))
+        with open(join(root, device, 'idVendor'), 'w') as fd:
+            fd.write('056a\n')
+
+    # Pen and touch of the same tablet, on two USB interfaces
+    add_event(root, 'event5', USB + '/1-2:1.0/0003:056A:0357.0001')
+    add_event(root, 'event6', USB + '/1-2:1.1/0003:056A:0357.0002')
+
+    # A virtual device, not backed by USB
+    add_event(root, 'event7', 'devices/virtual')
+
+    return root
+
+
+def test_physical_path_shared_by_interfaces(sysfs):
+    pen = physical_path('/dev/input/event5', sysfs=sysfs)
+    touch = physical_path('/dev/input/event6', sysfs=sysfs)
+
+    assert pen == touch == join(sysfs, USB)
+
+
+@pytest.mark.parametrize('node', ['/dev/input/event7', '/dev/input/event9'])
+def test_physical_path_falls_back_to_node(sysfs, node):
+    assert physical_path(node, sysfs=sysfs) == node
+
+
+try:
+    from Xlib.error import XError
+except ImportError:
+    XError = Exception
+
+
+class BadDevice(XError):
+    def __init__(self, deviceid):
+        Exception.__init__(self, deviceid)
+        self._data = {'resource_id': deviceid}
+
+    def __str__(self):
+        return 'BadDevice {}'.format(self.resource_id)
+
+
+class FakeDisplay:
+    """
+    Canned X server, with devices as ``(name, use, product, node, tool)``.
+    """
+
+    def __init__(self, devices):
+        from Xlib import Xatom
+
+        self.atoms = {}
+        self.devices = {}
+        self.properties = {}
+        self.events = []
+
+        for deviceid, (name, use, product, node, tool) in devices.items():
+            self.plug(deviceid, name, use)
+            for prop, prop_type, value in (
+                (registry.PRODUCT_ID_PROPERTY, Xatom.INTEGER, product),
+                (registry.DEVICE_NODE_PROPERTY, Xatom.STRING, node),
+                (
+                    registry.WACOM_TOOL_TYPE_PROPERTY, Xatom.ATOM,
+                    tool and [self.intern_atom(tool)],
+                ),
+            ):
+                if value:
+                    self.properties[(deviceid, self.intern_atom(prop))] = (
+                        prop_type, value,
+                    )
+
+    def plug(self, deviceid, name, use):
+        self.devices[deviceid] = SimpleNamespace(
+            deviceid=deviceid, name=name, use=use, attachment=2,
+            enabled=True, classes=[],
+        )
+
+    def hotplug(self, deviceid, flags):
+        self.events.append(SimpleNamespace(
+            type=registry.ge.GenericEventCode,
+            evtype=xinput.HierarchyChanged,
+            data=SimpleNamespace(info=[
+                SimpleNamespace(deviceid=deviceid, flags=flags),
+            ]),
+        ))
+
+    def intern_atom(self, name):
+        return self.atoms.setdefault(name, 1000 + len(self.atoms))
+
+    def screen(self):
+        return SimpleNamespace(root=SimpleNamespace(
+            xinput_select_events=lambda masks: None,
+        ))
+
+    def xinput_query_device(self, deviceid):
+        if deviceid == xinput.AllDevices:
+            return SimpleNamespace(devices=list(self.devices.values()))
+        if deviceid not in self.devices:
+            raise BadDevice(deviceid)
+        return SimpleNamespace(devices=[self.devices[deviceid]])
+
+    def xinput_get_device_property(
+        self, deviceid, prop, prop_type, offset, length,
+    ):
+        if deviceid not in self.devices:
+            raise BadDevice(deviceid)
+        if (deviceid, prop) not in self.properties:
+            return SimpleNamespace(type=0, value=None)
+
+        found, value = self.properties[(deviceid, prop)]
+        if prop_type not in (0, found):
+            return SimpleNamespace(type=found, value=None)
+        return SimpleNamespace(type=found, value=(32, value))
+
+    def pending_events(self):
+        return len(self.events)
+
+    def next_event(self):
+        return self.events.pop(0)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    if xinput is None:
+        pytest.skip('python-xlib is needed')
+
+    monkeypatch.setattr(registry, 'physical_path', lambda node: 'usb' + node)
+
+    display = FakeDisplay({
+        10: ('Tablet Pen', xinput.SlavePointer, [0x56a, 0x357], b'1',
+             'STYLUS'),
+        11: ('Tablet Pad', xinput.SlavePointer, [0x56a, 0x357], b'1',
+             'PAD'),
+        12: ('Twin Pen', xinput.SlavePointer, [0x56a, 0x358], b'2', None),
+        13: ('Twin Pen', xinput.SlavePointer, [0x56a, 0x358], b'3', None),
+        14: ('Mouse', xinput.SlavePointer, None, None, None),
+    })
+    monkeypatch.setattr(registry, 'open_display', lambda name: display)
+    return display
+
+
+def test_hotplug_of_vanished_device(fake):
+    with DeviceRegistry() as devices:
+        # Added and removed again before the event is processed
+        fake.hotplug(20, xinput.SlaveAdded)
+
+        # Disabled, then unplugged before the event is processed
+        del fake.devices[14]
+        fake.hotplug(14, xinput.DeviceDisabled)
+
+        assert devices.process_events() == 2
+        assert devices.get(20) is None
+        assert devices.get(14) is None
+        assert devices.get(10)['type'] == 'stylus'
+
+
+def test_tablet_ids(fake):
+    with DeviceRegistry() as devices:
+        assert devices.tablet_ids('Tablet Pen') == {10, 11}
+        assert devices.tablet_ids(11) == {10, 11}
+        assert devices.tablet_ids(12) == {12}
+        assert devices.tablet_ids('Mouse') == {14}
+
+
+def test_tablet_ids_shared_name(fake):
+    with DeviceRegistry() as devices:
+        with pytest.raises(RuntimeError, match='2 tablets.*12, 13'):
+            devices.tablet_ids('Twin Pen')
+
+
+@pytest.mark.parametrize('device', ['Unknown Pen', 99, '10'])
+def test_tablet_ids_unknown(fake, device):
+    with DeviceRegistry() as devices:
+        with pytest.raises(RuntimeError, match='Unknown device'):
+            devices.tablet_ids(device)
+
+
+def test_types(fake):
+    with DeviceRegistry() as devices:
+        assert [device['id'] for device in devices.by_type('pad')] == [11]
+        assert sorted(
+            device['id'] for device in devices.by_type('stylus')
+        ) == [10, 12, 13]
+        assert [device['id'] for device in devices.by_type('other')] == [14]
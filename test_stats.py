@@ -0,0 +1,19 @@
+import pytest
+
+from .stats import percentile
+
+
+@pytest.mark.parametrize('percent, expected', [
+    (0, 1),
+    (10, 1),
+    (50, 5),
+    (51, 6),
+    (95, 10),
+    (100, 10),
+])
+def test_percentile(percent, expected):
+    assert percentile(list(range(1, 11)), percent) == expected
+
+
+def test_percentile_empty():
+    assert percentile([], 99) == 0.0
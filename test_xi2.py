@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pytest
+
+xinput = pytest.importorskip('Xlib.ext.xinput')
+
+from .xi2 import resolve_devices  # noqa: E402
+
+
+def device(deviceid, name, use, classes=()):
+    return SimpleNamespace(
+        deviceid=deviceid, name=name, use=use, classes=list(classes),
+    )
+
+
+@pytest.fixture
+def display():
+    devices = [
+        device(2, 'Virtual core pointer', xinput.MasterPointer),
+        device(3, 'Virtual core keyboard', xinput.MasterKeyboard),
+        device(10, 'Tablet Pen', xinput.SlaveKeyboard),
+        device(11, 'Tablet Pen', xinput.SlavePointer),
+        device(12, 'Twin Pen', xinput.SlavePointer),
+        device(13, 'Twin Pen', xinput.SlavePointer),
+        device(
+            14, 'Floating Pen', xinput.FloatingSlave,
+            [SimpleNamespace(type=xinput.ValuatorClass)],
+        ),
+        device(15, 'Floating Keys', xinput.FloatingSlave),
+    ]
+    return SimpleNamespace(
+        xinput_query_device=lambda deviceid: SimpleNamespace(
+            devices=devices,
+        ),
+    )
+
+
+def test_resolve_pointer_sharing_name_with_keyboard(display):
+    assert resolve_devices(display, ['Tablet Pen']) == {'Tablet Pen': 11}
+
+
+def test_resolve_ambiguous_name(display):
+    with pytest.raises(RuntimeError, match='12, 13'):
+        resolve_devices(display, ['Twin Pen'])
+
+
+def test_resolve_ids(display):
+    assert resolve_devices(display, ['2', 12, 14]) == {
+        '2': 2, 12: 12, 14: 14,
+    }
+
+
+@pytest.mark.parametrize('deviceid', [3, '10', 15, 99])
+def test_resolve_non_pointer_id(display, deviceid):
+    with pytest.raises(RuntimeError):
+        resolve_devices(display, [deviceid])
+
+
+def test_resolve_unknown_name(display):
+    with pytest.raises(RuntimeError):
+        resolve_devices(display, ['Floating Keys'])
@@ -0,0 +1,241 @@
+"""
+In-process XInput2 backend.
+
+Reads and writes the Coordinate Transformation Matrix of many devices over a
+single display connection, instead of spawning one ``xinput`` process per
+device. Requires python-xlib.
+"""
+
+from struct import pack, unpack
+from logging import getLogger
+from contextlib import contextmanager
+from collections import OrderedDict
+
+try:
+    from Xlib import X
+    from Xlib.display import Display
+    from Xlib.ext import xinput
+except ImportError:
+    Display = None
+
+from .xinput import CTM_PROPERTY, flatten_matrix
+
+
+log = getLogger(__name__)
+
+
+def open_display(name=None):
+    """
+    Open a connection to the X server and announce XInput 2 support.
+
+    :param str name: Display name, for example ``:1``. If None, the
+     ``DISPLAY`` environment variable is used.
+
+    :return: The open display. The caller must close it.
+    """
+    if Display is None:
+        raise RuntimeError('The python-xlib package is missing')
+
+    display = Display(name)
+    try:
+        if not display.has_extension('XInputExtension'):
+            raise RuntimeError(
+                'The X server at {} has no XInput extension'.format(
+                    display.get_display_name(),
+                )
+            )
+        display.xinput_query_version()
+    except Exception:
+        display.close()
+        raise
+
+    return display
+
+
+@contextmanager
+def connect(name=None):
+    """
+    Open a connection to the X server with the XInput extension.
+
+    :param str name: Display name, for example ``:1``. If None, the
+     ``DISPLAY`` environment variable is used.
+    """
+    display = open_display(name)
+    try:
+        yield display
+    finally:
+        display.close()
+
+
+def _is_pointer(info):
+    if info.use in (xinput.MasterPointer, xinput.SlavePointer):
+        return True
+
+    # Floating slaves keep their classes but not their use, so a floating
+    # tablet is recognized by its axes
+    return info.use == xinput.FloatingSlave and any(
+        cls.type == xinput.ValuatorClass for cls in info.classes
+    )
+
+
+def list_devices(display, pointers_only=False):
+    """
+    List the input devices of the X server.
+
+    :param display: An open display, as returned by ``connect()``.
+    :param bool pointers_only: Only list the pointer devices, the only ones
+     that have a Coordinate Transformation Matrix.
+
+    :return: Mapping of device ID to device name.
+    :rtype: OrderedDict
+    """
+    reply = display.xinput_query_device(xinput.AllDevices)
+    return OrderedDict(
+        (device.deviceid, device.name)
+        for device in reply.devices
+        if not pointers_only or _is_pointer(device)
+    )
+
+
+def resolve_devices(display, devices):
+    """
+    Resolve pointer device names or IDs to device IDs, with a single query.
+
+    Tablets often register a pointer and a keyboard under the same name, so
+    only pointer devices are considered. Like ``xinput``, a name shared by
+    more than one pointer is an error.
+
+    :param display: An open display, as returned by ``connect()``.
+    :param list devices: Device names or IDs.
+
+    :return: Mapping of the given device to its ID.
+    :rtype: OrderedDict
+    """
+    by_name = {}
+    known = list_devices(display, pointers_only=True)
+    for deviceid, name in known.items():
+        by_name.setdefault(name, []).append(deviceid)
+
+    resolved = OrderedDict()
+    for device in devices:
+        if isinstance(device, int) or str(device).isdigit():
+            deviceid = int(device)
+            if deviceid not in known:
+                deviceid = None
+        else:
+            matches = by_name.get(device, [])
+            if len(matches) > 1:
+                raise RuntimeError(
+                    'There are {} pointer devices named {}, use one of the '
+                    'IDs {} instead'.format(
+                        len(matches), repr(device),
+                        ', '.join(map(str, matches)),
+                    )
+                )
+            deviceid = matches[0] if matches else None
+
+        if deviceid is None:
+            raise RuntimeError(
+                'Unknown pointer device {}'.format(repr(device))
+            )
+
+        resolved[device] = deviceid
+
+    return resolved
+
+
+def get_matrices(devices, name=None):
+    """
+    Read the Coordinate Transformation Matrix of many devices.
+
+    :param list devices: Device names or IDs.
+    :param str name: Display name. If None, the ``DISPLAY`` environment
+     variable is used.
+
+    :return: Mapping of device to its 3x3 matrix, or None if the device
+     doesn't expose the property.
+    :rtype: OrderedDict
+    """
+    with connect(name) as display:
+        prop = display.intern_atom(CTM_PROPERTY)
+        float_type = display.intern_atom('FLOAT')
+
+        matrices = OrderedDict()
+        for device, deviceid in resolve_devices(display, devices).items():
+            reply = display.xinput_get_device_property(
+                deviceid, prop, float_type, 0, 9,
+            )
+
+            if reply.type != float_type or not reply.value:
+                matrices[device] = None
+                continue
+
+            _, data = reply.value
+            values = unpack('=9f', data.tobytes())
+            matrices[device] = [
+                list(values[0:3]),
+                list(values[3:6]),
+                list(values[6:9]),
+            ]
+
+    return matrices
+
+
+def set_matrices(matrices, name=None):
+    """
+    Write the Coordinate Transformation Matrix of many devices in one batch.
+
+    All requests are queued on a single connection and sent with a single
+    round trip to the X server, that also reports any error.
+
+    :param dict matrices: Mapping of device name or ID to its 3x3 matrix, or
+     a sequence of (device, matrix) pairs.
+    :param str name: Display name. If None, the ``DISPLAY`` environment
+     variable is used.
+    """
+    if hasattr(matrices, 'items'):
+        matrices = matrices.items()
+    matrices = list(matrices)
+
+    errors = []
+
+    with connect(name) as display:
+        display.set_error_handler(
+            lambda error, request: errors.append(error)
+        )
+
+        prop = display.intern_atom(CTM_PROPERTY)
+        float_type = display.intern_atom('FLOAT')
+        resolved = resolve_devices(
+            display, [device for device, _ in matrices],
+        )
+
+        for device, matrix in matrices:
+            log.debug(
+                'Queueing {} for device {}'.format(
+                    CTM_PROPERTY, repr(device),
+                )
+            )
+            display.xinput_change_device_property(
+                resolved[device], prop, float_type, X.PropModeReplace,
+                (32, pack('=9f', *flatten_matrix(matrix))),
+            )
+
+        display.sync()
+
+    if errors:
+        raise RuntimeError(
+            'Failed to set {} on {} device(s): {}'.format(
+                CTM_PROPERTY, len(errors), errors[0],
+            )
+        )
+
+
+__all__ = [
+    'open_display',
+    'connect',
+    'list_devices',
+    'resolve_devices',
+    'get_matrices',
+    'set_matrices',
+]
@@ -14,36 +14,187 @@
 #
 #
 #   xinput map-to-output 19 HDMI-0
+#
+# To compute and apply the matrix for a device, use the planner:
+#
+#   python3 -m tabletconf.planner 'Tablet Monitor Pen Pen (0)=HDMI-0'
 
-device = 'Tablet Monitor Pen Pen (0)'
-
-total_height = 1080 * 2
-total_width = 1920 * 2
+from re import compile
+from shutil import which
+from subprocess import run, PIPE
+from collections import OrderedDict
 
-touch_area_width = 1920
-touch_area_height = 1080
-touch_area_x_offset = 1920
-touch_area_y_offset = 1080
+from .xrandr import display_environ
 
-c0 = touch_area_width / total_width
-c2 = touch_area_height / total_height
-c1 = touch_area_x_offset / total_width
-c3 = touch_area_y_offset / total_height
 
-cmatrix = [
-    [c0, 0, c1],
-    [0, c2, c3],
-    [0, 0, 1],
-]
+CTM_PROPERTY = 'Coordinate Transformation Matrix'
 
-prop = (
-    ' '.join(' '.join(str(column) for column in row) for row in cmatrix)
+# Matches the property line of `xinput list-props`, for example:
+#   Coordinate Transformation Matrix (152):  1.000000, 0.000000, ...
+CTM_REGEX = compile(
+    r'^\s*' + CTM_PROPERTY + r' \((?P<atom>[0-9]+)\):\s*(?P<values>.*)$'
 )
 
-print(
-    'xinput set-prop "{}" --type=float '
-    '"Coordinate Transformation Matrix" {}'.format(
-        device,
-        prop,
+# Matches the header `xinput list-props` prints before each device
+DEVICE_REGEX = compile(r"^Device '(?P<name>.*)':$")
+
+
+def calculate_matrix(display, vspace):
+    """
+    Calculate the Coordinate Transformation Matrix that confines an input
+    device to the given display.
+
+    :param dict display: Display as returned by ``parse_xrandr()``.
+    :param tuple vspace: Virtual space (width, height) as returned by
+     ``calculate_virtual_space()``.
+
+    :return: The 3x3 transformation matrix.
+    :rtype: list
+    """
+    total_width, total_height = vspace
+
+    touch_area_width = display['width']
+    touch_area_height = display['height']
+    touch_area_x_offset = display['x_offset']
+    touch_area_y_offset = display['y_offset']
+
+    c0 = touch_area_width / total_width
+    c2 = touch_area_height / total_height
+    c1 = touch_area_x_offset / total_width
+    c3 = touch_area_y_offset / total_height
+
+    return [
+        [c0, 0, c1],
+        [0, c2, c3],
+        [0, 0, 1],
+    ]
+
+
+def flatten_matrix(matrix):
+    return [float(column) for row in matrix for column in row]
+
+
+def format_matrix(matrix):
+    return ' '.join(str(column) for row in matrix for column in row)
+
+
+def _xinput():
+    xinput = which('xinput')
+    if not xinput:
+        raise RuntimeError('The xinput executable is missing')
+    return xinput
+
+
+def set_prop_command(device, matrix):
+    return [
+        'xinput', 'set-prop', device, '--type=float',
+        CTM_PROPERTY,
+    ] + [str(column) for row in matrix for column in row]
+
+
+def _parse_matrix(device, values):
+    values = [float(value) for value in values.split(',')]
+    if len(values) != 9:
+        raise RuntimeError(
+            'Unexpected {} for {}: {}'.format(
+                CTM_PROPERTY, repr(device), values,
+            )
+        )
+
+    return [values[0:3], values[3:6], values[6:9]]
+
+
+def get_matrices(devices, display=None):
+    """
+    Read the current Coordinate Transformation Matrix of many devices with a
+    single ``xinput list-props`` call.
+
+    :param list devices: Names or IDs of the input devices.
+    :param str display: Display name. If None, the ``DISPLAY`` environment
+     variable is used.
+
+    :return: Mapping of device to its 3x3 transformation matrix, or None if
+     the device doesn't expose the property.
+    :rtype: OrderedDict
+    """
+    devices = list(devices)
+    if not devices:
+        return OrderedDict()
+
+    result = run(
+        [_xinput(), 'list-props'] + [str(device) for device in devices],
+        check=True,
+        stdout=PIPE,
+        stderr=PIPE,
+        universal_newlines=True,
+        env=display_environ(display),
     )
-)
+
+    # xinput prints one section per device, in the order they were given,
+    # and skips the devices it can't find
+    sections = []
+    for line in result.stdout.splitlines():
+        if DEVICE_REGEX.match(line):
+            sections.append(None)
+            continue
+
+        match = CTM_REGEX.match(line)
+        if match and sections:
+            sections[-1] = match.group('values')
+
+    if len(sections) != len(devices):
+        raise RuntimeError(
+            'xinput listed {} of {} devices: {}'.format(
+                len(sections), len(devices), result.stderr.strip(),
+            )
+        )
+
+    return OrderedDict(
+        (
+            device,
+            _parse_matrix(device, values) if values is not None else None,
+        )
+        for device, values in zip(devices, sections)
+    )
+
+
+def get_matrix(device, display=None):
+    """
+    Read the current Coordinate Transformation Matrix of a device.
+
+    :param str device: Name or ID of the input device.
+    :param str display: Display name. If None, the ``DISPLAY`` environment
+     variable is used.
+
+    :return: The 3x3 transformation matrix, or None if the device doesn't
+     expose the property.
+    :rtype: list
+    """
+    return get_matrices([device], display=display)[device]
+
+
+def set_matrix(device, matrix, display=None):
+    """
+    Set the Coordinate Transformation Matrix of a device.
+
+    :param str device: Name or ID of the input device.
+    :param list matrix: The 3x3 transformation matrix.
+    :param str display: Display name. If None, the ``DISPLAY`` environment
+     variable is used.
+    """
+    command = set_prop_command(str(device), matrix)
+    command[0] = _xinput()
+    run(command, check=True, env=display_environ(display))
+
+
+__all__ = [
+    'CTM_PROPERTY',
+    'calculate_matrix',
+    'flatten_matrix',
+    'format_matrix',
+    'set_prop_command',
+    'get_matrices',
+    'get_matrix',
+    'set_matrix',
+]
+
@@ -1,3 +1,4 @@
+from os import environ
 from re import compile
 from shutil import which
 from subprocess import run, PIPE
@@ -12,7 +13,25 @@ XRANDR_REGEX = compile(
 )
 
 
-def parse_xrandr():
+def display_environ(display=None):
+    """
+    Environment for an X client talking to the given display.
+
+    :param str display: Display name, for example ``:1``. If None, the
+     ambient environment is used.
+
+    :return: The environment, or None to inherit the current one.
+    :rtype: dict
+    """
+    if display is None:
+        return None
+
+    env = dict(environ)
+    env['DISPLAY'] = display
+    return env
+
+
+def parse_xrandr(display=None):
     xrandr = which('xrandr')
     if not xrandr:
         raise RuntimeError('The xrandr executable is missing')
@@ -21,6 +40,7 @@ def parse_xrandr():
         [xrandr],
         check=True,
         stdout=PIPE,
+        env=display_environ(display),
         # This actually means open in text mode with system encoding, yeah
         universal_newlines=True,
     )
@@ -62,6 +82,7 @@ def calculate_virtual_space(displays):
 
 
 __all__ = [
+    'display_environ',
     'parse_xrandr',
     'calculate_virtual_space',
 ]
@@ -0,0 +1,60 @@
+"""
+Throwaway X servers for benchmarks and manual testing.
+"""
+
+from os import pipe, read, close
+from shutil import which
+from subprocess import Popen, DEVNULL
+from contextlib import contextmanager
+
+
+@contextmanager
+def xvfb(screen='1920x1080x24'):
+    """
+    Start an Xvfb server on a free display number.
+
+    :param str screen: Geometry and depth of the first screen.
+
+    :return: The display name, for example ``:1``.
+    :rtype: str
+    """
+    executable = which('Xvfb')
+    if not executable:
+        raise RuntimeError('The Xvfb executable is missing')
+
+    # Xvfb writes the display number it picked to the given file descriptor
+    # once it is ready to accept connections
+    rfd, wfd = pipe()
+    process = Popen(
+        [
+            executable, '-displayfd', str(wfd),
+            '-screen', '0', screen,
+            '-nolisten', 'tcp',
+        ],
+        pass_fds=(wfd,),
+        stdout=DEVNULL,
+        stderr=DEVNULL,
+    )
+    close(wfd)
+
+    try:
+        number = b''
+        while not number.endswith(b'\n'):
+            chunk = read(rfd, 16)
+            if not chunk:
+                raise RuntimeError(
+                    'Xvfb exited with code {}'.format(process.wait())
+                )
+            number += chunk
+
+        yield ':{}'.format(int(number))
+
+    finally:
+        close(rfd)
+        process.terminate()
+        process.wait()
+
+
+__all__ = [
+    'xvfb',
+]